@@ -1,10 +1,13 @@
 import streamlit as st
+import io
 import os
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
+from psycopg2.pool import ThreadedConnectionPool
 import traceback
+import numpy as np
 import pandas as pd
-import math
+from concurrent.futures import ThreadPoolExecutor
 
 st.set_page_config(page_title="Satelit Links App", layout="wide")
 
@@ -26,13 +29,17 @@ def get_db_params():
     }
 
 
-def connect_db(params):
-    return psycopg2.connect(
-        host=params["host"],
-        port=params["port"],
-        dbname=params["dbname"],
-        user=params["user"],
-        password=params["password"],
+@st.cache_resource(show_spinner=False)
+def get_pool(host, port, dbname, user, password):
+    """Pool koneksi yang dipakai ulang lintas rerun (tidak handshake per query)."""
+    return ThreadedConnectionPool(
+        1,
+        10,
+        host=host,
+        port=port,
+        dbname=dbname,
+        user=user,
+        password=password,
         cursor_factory=RealDictCursor,
         options="-c client_encoding=UTF8",
         connect_timeout=8,
@@ -64,6 +71,11 @@ CREATE TABLE IF NOT EXISTS links (
     bandwidth INT,
     model VARCHAR(100)
 );
+
+CREATE INDEX IF NOT EXISTS idx_sites_name ON sites(site_name);
+CREATE INDEX IF NOT EXISTS idx_links_client ON links(client_id);
+CREATE INDEX IF NOT EXISTS idx_links_from ON links(site_from);
+CREATE INDEX IF NOT EXISTS idx_links_to ON links(site_to);
 """
 
 
@@ -73,8 +85,9 @@ st.title("Peta Link Satelit")
 params = get_db_params()
 
 def run_sql(sql, args=None, fetch: str = "none"):
-    """Jalankan SQL singkat. fetch: none|one|all."""
-    conn = connect_db(params)
+    """Jalankan SQL singkat pada koneksi dari pool. fetch: none|one|all."""
+    pool = get_pool(**params)
+    conn = pool.getconn()
     try:
         with conn.cursor() as cur:
             cur.execute(sql, args or ())
@@ -86,21 +99,126 @@ def run_sql(sql, args=None, fetch: str = "none"):
                 row = None
         conn.commit()
         return row
+    except Exception:
+        # Rollback agar koneksi bersih saat dikembalikan ke pool
+        conn.rollback()
+        raise
     finally:
-        conn.close()
+        pool.putconn(conn)
+
+def _import_clients(cur, unique_clients) -> tuple:
+    """Pastikan semua nama client ada; kembalikan (map nama -> client_id,
+    jumlah client yang baru di-insert)."""
+    cur.execute(
+        "SELECT client_id, client_name FROM clients WHERE client_name = ANY(%s)",
+        (list(unique_clients),),
+    )
+    client_id_map = {r["client_name"]: r["client_id"] for r in cur.fetchall()}
+    new_names = [c for c in unique_clients if c not in client_id_map]
+    if new_names:
+        cur.execute(RESEED_CLIENTS_SQL)
+        # Satu multi-row INSERT (ON CONFLICT tidak bisa:
+        # client_name tidak punya unique constraint)
+        execute_values(
+            cur,
+            "INSERT INTO clients(client_name) VALUES %s",
+            [(n,) for n in new_names],
+            page_size=500,
+        )
+        cur.execute(
+            "SELECT client_id, client_name FROM clients WHERE client_name = ANY(%s)",
+            (new_names,),
+        )
+        client_id_map.update({r["client_name"]: r["client_id"] for r in cur.fetchall()})
+    return client_id_map, len(new_names)
+
+def copy_sites(cur, df_sites: pd.DataFrame) -> int:
+    """Bulk load sites lewat COPY ke staging table, lalu upsert dengan
+    ON CONFLICT DO NOTHING. Mengembalikan jumlah baris yang benar-benar masuk."""
+    buf = io.StringIO()
+    df_sites.to_csv(buf, index=False, header=False)
+    buf.seek(0)
+    cur.execute("CREATE TEMP TABLE sites_stage (LIKE sites) ON COMMIT DROP")
+    cur.copy_expert(
+        "COPY sites_stage(site_id, site_name, site_address, lat_dec, long_dec) FROM STDIN WITH CSV",
+        buf,
+    )
+    cur.execute(
+        """
+        INSERT INTO sites(site_id, site_name, site_address, lat_dec, long_dec)
+        SELECT DISTINCT ON (site_id) site_id, site_name, site_address, lat_dec, long_dec
+        FROM sites_stage
+        ON CONFLICT (site_id) DO NOTHING
+        """
+    )
+    return cur.rowcount
+
+def _links_candidates(df: pd.DataFrame, client_id_map: dict) -> pd.DataFrame:
+    """Susun kandidat baris links dari CSV secara kolom (tanpa loop per baris)."""
+    def col(name):
+        return df[name] if name in df.columns else pd.Series(pd.NA, index=df.index)
+
+    out = pd.DataFrame({
+        "appl_id": col("APPL_ID").astype("string").str.strip(),
+        "client_id": col("CLNT_NAME").map(client_id_map).astype("Int64"),
+        "site_from": col("STN_NAME").astype("string").str.strip(),
+        "site_to": col("STASIUN_LAWAN").astype("string").str.strip(),
+        "freq": pd.to_numeric(col("FREQ"), errors="coerce").astype("Int64"),
+        "freq_pair": pd.to_numeric(col("FREQ_PAIR"), errors="coerce").astype("Int64"),
+        "bandwidth": pd.to_numeric(col("BWIDTH"), errors="coerce").astype("Int64"),
+        "model": col("EQ_MDL").astype("string").str.strip(),
+    })
+    return out[out["site_from"].notna() & out["site_to"].notna() & out["client_id"].notna()]
+
+def copy_links(cur, df_links: pd.DataFrame) -> int:
+    """Bulk load links lewat COPY ke staging table, lalu insert hanya baris yang
+    belum ada (anti-join appl_id+site_from+site_to). Mengembalikan jumlah masuk."""
+    buf = io.StringIO()
+    df_links.to_csv(buf, index=False, header=False)
+    buf.seek(0)
+    cur.execute("CREATE TEMP TABLE links_stage (LIKE links INCLUDING DEFAULTS) ON COMMIT DROP")
+    cur.copy_expert(
+        "COPY links_stage(appl_id, client_id, site_from, site_to, freq, freq_pair, bandwidth, model) FROM STDIN WITH CSV",
+        buf,
+    )
+    # Syarat EXISTS ke sites: link yang endpoint-nya tidak masuk (mis. site
+    # di-skip karena koordinat tidak valid) dilewati, bukan meledakkan
+    # seluruh transaksi dengan pelanggaran foreign key
+    cur.execute(
+        """
+        INSERT INTO links(appl_id, client_id, site_from, site_to, freq, freq_pair, bandwidth, model)
+        SELECT appl_id, client_id, site_from, site_to, freq, freq_pair, bandwidth, model
+        FROM links_stage t
+        WHERE NOT EXISTS (
+            SELECT 1 FROM links l
+            WHERE l.appl_id = t.appl_id AND l.site_from = t.site_from AND l.site_to = t.site_to
+        )
+        AND EXISTS (SELECT 1 FROM sites sf WHERE sf.site_id = t.site_from)
+        AND EXISTS (SELECT 1 FROM sites st WHERE st.site_id = t.site_to)
+        """
+    )
+    return cur.rowcount
+
+RESEED_CLIENTS_SQL = """
+SELECT setval(
+    pg_get_serial_sequence('clients','client_id'),
+    COALESCE((SELECT MAX(client_id) FROM clients), 0),
+    true
+)
+"""
+
+RESEED_LINKS_SQL = """
+SELECT setval(
+    pg_get_serial_sequence('links','link_id'),
+    COALESCE((SELECT MAX(link_id) FROM links), 0),
+    true
+)
+"""
 
 def reseed_clients_id_sequence():
     """Sinkronkan sequence clients.client_id agar lanjut setelah MAX(client_id)."""
     try:
-        run_sql(
-            """
-            SELECT setval(
-                pg_get_serial_sequence('clients','client_id'),
-                COALESCE((SELECT MAX(client_id) FROM clients), 0),
-                true
-            )
-            """
-        )
+        run_sql(RESEED_CLIENTS_SQL)
     except Exception:
         # Abaikan jika gagal (mis. bukan SERIAL), agar tidak memblokir aksi utama
         pass
@@ -108,15 +226,7 @@ def reseed_clients_id_sequence():
 def reseed_links_id_sequence():
     """Sinkronkan sequence links.link_id setelah insert manual."""
     try:
-        run_sql(
-            """
-            SELECT setval(
-                pg_get_serial_sequence('links','link_id'),
-                COALESCE((SELECT MAX(link_id) FROM links), 0),
-                true
-            )
-            """
-        )
+        run_sql(RESEED_LINKS_SQL)
     except Exception:
         pass
 
@@ -130,30 +240,91 @@ with st.sidebar:
         if st.button("⚙️ Init Schema", use_container_width=True):
             try:
                 run_sql(SCHEMA_SQL)
+                # Sinkronkan sequence sekali di sini, bukan spekulatif per insert
+                reseed_clients_id_sequence()
+                reseed_links_id_sequence()
                 st.success("Schema berhasil diterapkan/ada.")
             except Exception as e:
                 st.error(f"Gagal membuat schema: {e}")
 
-@st.cache_data(show_spinner=False)
-def load_data(_params):
-    sql_clients = "select client_id, client_name from clients order by client_id"
-    sql_sites = "select site_id, site_name, site_address, lat_dec, long_dec from sites"
-    sql_links = "select link_id, appl_id, client_id, site_from, site_to, freq, freq_pair, bandwidth, model from links"
-    conn = connect_db(_params)
+def _fetch_df(sql, _params, args=None):
+    pool = get_pool(**_params)
+    conn = pool.getconn()
     try:
-        with conn.cursor() as cur:
-            cur.execute(sql_clients)
-            clients = pd.DataFrame(cur.fetchall()) if cur.rowcount != -1 else pd.DataFrame()
-            cur.execute(sql_sites)
-            sites = pd.DataFrame(cur.fetchall()) if cur.rowcount != -1 else pd.DataFrame()
-            cur.execute(sql_links)
-            links = pd.DataFrame(cur.fetchall()) if cur.rowcount != -1 else pd.DataFrame()
+        # Cursor tuple biasa: jauh lebih hemat daripada dict per baris via RealDictCursor
+        with conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cur:
+            cur.execute(sql, args or ())
+            cols = [d[0] for d in cur.description]
+            df = pd.DataFrame(cur.fetchall(), columns=cols)
     finally:
-        conn.close()
-    return clients, sites, links
+        pool.putconn(conn)
+    return df
+
+# Loader menerima kredensial sebagai skalar (hashable murah + ikut cache key)
+@st.cache_data(show_spinner=False, ttl="10m", max_entries=4)
+def load_clients(host, port, dbname, user, password):
+    _params = dict(host=host, port=port, dbname=dbname, user=user, password=password)
+    return _fetch_df("select client_id, client_name from clients order by client_name, client_id", _params)
+
+@st.cache_data(show_spinner=False, ttl="10m", max_entries=4)
+def load_sites(host, port, dbname, user, password):
+    _params = dict(host=host, port=port, dbname=dbname, user=user, password=password)
+    return _fetch_df("select site_id, site_name, site_address, lat_dec, long_dec from sites order by site_name, site_id", _params)
+
+@st.cache_data(show_spinner=False, ttl="10m", max_entries=16)
+def load_links(host, port, dbname, user, password, client_id=None):
+    _params = dict(host=host, port=port, dbname=dbname, user=user, password=password)
+    sql = """
+        select l.link_id, l.appl_id, l.client_id, l.site_from, l.site_to,
+               l.freq, l.freq_pair, l.bandwidth, l.model,
+               sf.site_name as from_name, st.site_name as to_name
+        from links l
+        left join sites sf on sf.site_id = l.site_from
+        left join sites st on st.site_id = l.site_to
+    """
+    if client_id is not None:
+        # Filter di server: index idx_links_client memangkas scan + transfer
+        df = _fetch_df(sql + " where l.client_id = %s order by l.link_id", _params, (int(client_id),))
+    else:
+        df = _fetch_df(sql + " order by l.link_id", _params)
+    if not df.empty:
+        # Label "id — nama" dirakit sekali di sini, bukan per render
+        sf = df["site_from"].astype(str)
+        stn = df["site_to"].astype(str)
+        df["from_label"] = (sf + " — " + df["from_name"].astype(str)).where(df["from_name"].notna(), sf)
+        df["to_label"] = (stn + " — " + df["to_name"].astype(str)).where(df["to_name"].notna(), stn)
+        df = df.drop(columns=["from_name", "to_name"])
+    return df
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _keys_and_index(m: dict):
+    """Daftar key terurut + reverse index posisi, untuk options/index selectbox."""
+    keys = list(m)
+    return keys, {k: i for i, k in enumerate(keys)}
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _build_client_map(df: pd.DataFrame):
+    if df.empty:
+        return {}
+    return dict(zip(df["client_id"].astype(int).to_numpy(), df["client_name"].astype(str).to_numpy()))
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _build_site_label_map(df: pd.DataFrame):
+    if df.empty:
+        return {}
+    sids = df["site_id"].astype(str)
+    labels = (sids + " — " + df["site_name"].astype(str)).where(df["site_name"].notna(), sids)
+    return dict(zip(sids.to_numpy(), labels.to_numpy()))
 
 try:
-    clients_df, sites_df, links_df = load_data(params)
+    # Tiga SELECT independen: jalankan paralel di tiga koneksi pool
+    with ThreadPoolExecutor(max_workers=3) as _ex:
+        _f_clients = _ex.submit(load_clients, **params)
+        _f_sites = _ex.submit(load_sites, **params)
+        _f_links = _ex.submit(load_links, **params)
+        clients_df = _f_clients.result()
+        sites_df = _f_sites.result()
+        links_df = _f_links.result()
 except Exception as e:
     st.error(f"Gagal mengambil data: {e}")
     st.caption("Cek koneksi dan kredensial database.")
@@ -161,7 +332,7 @@ except Exception as e:
 
 with st.sidebar:
     st.header("Filter")
-    client_options = {int(row.client_id): row.client_name for _, row in clients_df.iterrows()} if not clients_df.empty else {}
+    client_options = _build_client_map(clients_df)
     selected_client = st.selectbox(
         "Client",
         options=[None] + list(client_options.keys()),
@@ -200,8 +371,30 @@ with st.sidebar:
     # Gunakan Folium (cluster) sebagai default tanpa perlu toggle
     use_folium = True
 
-def _refresh_and_rerun():
-    load_data.clear()
+@st.cache_data(show_spinner=False, max_entries=8)
+def _sites_by_id(df: pd.DataFrame) -> pd.DataFrame:
+    """Sites diindeks site_id (string) untuk lookup baris O(1)."""
+    return df.set_index(df["site_id"].astype(str))
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _search_index(df: pd.DataFrame, cols: tuple) -> pd.Series:
+    """Gabungan kolom (lowercase) untuk filter substring tanpa cast ulang per rerun."""
+    joined = df[cols[0]].astype(str)
+    for c in cols[1:]:
+        joined = joined + " " + df[c].astype(str)
+    return joined.str.lower()
+
+def _df_cache_key(df: pd.DataFrame) -> int:
+    """Kunci cache murah untuk DataFrame. Kolom berisi list Python
+    (path/curve_points) membuat hash_pandas_object melempar TypeError,
+    jadi dibuang dulu — keduanya turunan deterministik dari kolom
+    koordinat/ctrl yang tetap ikut di-hash."""
+    return int(pd.util.hash_pandas_object(df.drop(columns=["path", "curve_points"], errors="ignore")).sum())
+
+def _refresh_and_rerun(*loaders):
+    """Bersihkan cache loader yang terdampak saja, lalu rerun."""
+    for loader in loaders or (load_clients, load_sites, load_links):
+        loader.clear()
     st.rerun()
 
 # Dialogs for Clients
@@ -221,11 +414,12 @@ def dlg_add_client():
             try:
                 try:
                     run_sql("INSERT INTO clients(client_name) VALUES (%s)", (name.strip(),))
-                except Exception:
+                except psycopg2.errors.UniqueViolation:
+                    # Sequence tertinggal setelah insert manual; perbaiki lalu ulangi sekali
                     reseed_clients_id_sequence()
                     run_sql("INSERT INTO clients(client_name) VALUES (%s)", (name.strip(),))
                 st.success("Client berhasil ditambah.")
-                _refresh_and_rerun()
+                _refresh_and_rerun(load_clients)
             except Exception as e:
                 st.error(f"Gagal menambah client: {e}")
 
@@ -244,7 +438,7 @@ def dlg_edit_client(edit_id: int, current_name: str):
             try:
                 run_sql("UPDATE clients SET client_name=%s WHERE client_id=%s", (new_name.strip(), int(edit_id)))
                 st.success("Client berhasil diubah.")
-                _refresh_and_rerun()
+                _refresh_and_rerun(load_clients)
             except Exception as e:
                 st.error(f"Gagal mengubah client: {e}")
 
@@ -261,10 +455,9 @@ def dlg_delete_clients(del_ids: list, label_map: dict):
     with col_b:
         if st.button("Hapus", type="primary", key="dlg_delete_clients_confirm"):
             try:
-                for cid in del_ids:
-                    run_sql("DELETE FROM clients WHERE client_id=%s", (int(cid),))
+                run_sql("DELETE FROM clients WHERE client_id = ANY(%s)", (list(map(int, del_ids)),))
                 st.success("Client terhapus.")
-                _refresh_and_rerun()
+                _refresh_and_rerun(load_clients)
             except Exception as e:
                 st.error(f"Gagal menghapus: {e}")
 
@@ -280,13 +473,11 @@ with st.expander("Kelola Clients", expanded=False):
             dlg_add_client()
 
     # Filtered view
-    clients_view = clients_df.copy()
-    if not clients_view.empty and q:
+    clients_view = clients_df
+    # Minimal 2 karakter: query 1 huruf nyaris tidak menyaring apa pun
+    if not clients_view.empty and q and len(str(q).strip()) >= 2:
         ql = str(q).strip().lower()
-        clients_view = clients_view[
-            clients_view["client_name"].astype(str).str.lower().str.contains(ql)
-            | clients_view["client_id"].astype(str).str.contains(ql)
-        ]
+        clients_view = clients_view[_search_index(clients_df, ("client_id", "client_name")).str.contains(ql, regex=False, na=False)]
 
     ctable, cactions = st.columns([3, 1])
     with ctable:
@@ -294,7 +485,7 @@ with st.expander("Kelola Clients", expanded=False):
             st.info("Tidak ada data client yang cocok.")
         else:
             st.dataframe(
-                clients_view.sort_values(["client_name", "client_id"], kind="stable"),
+                clients_view,
                 use_container_width=True,
                 hide_index=True,
                 height=300,
@@ -309,20 +500,19 @@ with st.expander("Kelola Clients", expanded=False):
         if clients_df.empty:
             st.caption("Tambahkan client terlebih dahulu.")
         else:
+            client_name_by_id = _build_client_map(clients_df)
             edit_pick = st.selectbox(
                 "Pilih client",
-                options=[None] + list(clients_df["client_id"].astype(int)),
-                format_func=lambda v: "— pilih —" if v is None else f"{v} — {clients_df.loc[clients_df.client_id==v, 'client_name'].values[0]}",
+                options=[None] + list(client_name_by_id.keys()),
+                format_func=lambda v: "— pilih —" if v is None else f"{v} — {client_name_by_id[v]}",
                 key="clients_pick_action",
             )
             if st.button("Ubah", disabled=edit_pick is None, use_container_width=True, key="btn_open_edit_client"):
                 if edit_pick is not None:
-                    current_name = str(clients_df.loc[clients_df.client_id==edit_pick, 'client_name'].values[0])
-                    dlg_edit_client(edit_pick, current_name)
+                    dlg_edit_client(edit_pick, client_name_by_id[int(edit_pick)])
             if st.button("Hapus", disabled=edit_pick is None, use_container_width=True, key="btn_open_delete_client"):
                 if edit_pick is not None:
-                    label_map = {int(r.client_id): r.client_name for _, r in clients_df.iterrows()}
-                    dlg_delete_clients([int(edit_pick)], label_map)
+                    dlg_delete_clients([int(edit_pick)], client_name_by_id)
 
 def _valid_latlon(lat, lon):
         try:
@@ -337,6 +527,12 @@ def _valid_latlon(lat, lon):
         if not (-180 <= lon <= 180):
             return False, "Longitude harus di antara -180 s/d 180."
         return True, "OK"
+
+def _valid_latlon_mask(lat: pd.Series, lon: pd.Series) -> pd.Series:
+    # Versi vektor untuk import massal; form dialog tetap pakai _valid_latlon
+    lat = pd.to_numeric(lat, errors="coerce")
+    lon = pd.to_numeric(lon, errors="coerce")
+    return lat.between(-90, 90) & lon.between(-180, 180)
 @st.dialog("Tambah Site")
 def dlg_add_site():
     site_id_in = st.text_input("Site ID", placeholder="cth: 1 atau LAWAN_1")
@@ -363,16 +559,18 @@ def dlg_add_site():
                     (site_id_in.strip(), site_name_in.strip(), site_addr_in.strip() or None, float(lat_in), float(lon_in)),
                 )
                 st.success("Site berhasil ditambah.")
-                _refresh_and_rerun()
+                _refresh_and_rerun(load_sites)
             except Exception as e:
                 st.error(f"Gagal menambah site: {e}")
 
 @st.dialog("Ubah Site")
 def dlg_edit_site(sid: str, srow):
-    sname = st.text_input("Nama Site", value=str(srow.site_name or ""))
-    saddr = st.text_area("Alamat (opsional)", value=str(srow.site_address or ""), height=80)
-    slat = st.number_input("Latitude", value=float(srow.lat_dec) if pd.notna(srow.lat_dec) else 0.0, step=0.000001, format="%.8f")
-    slon = st.number_input("Longitude", value=float(srow.long_dec) if pd.notna(srow.long_dec) else 0.0, step=0.000001, format="%.8f")
+    # Konversi sekali ke dict polos (NaN -> None), akses berikutnya tanpa dispatch pandas
+    r = {k: (None if pd.isna(v) else v) for k, v in srow.items()}
+    sname = st.text_input("Nama Site", value=str(r["site_name"] or ""))
+    saddr = st.text_area("Alamat (opsional)", value=str(r["site_address"] or ""), height=80)
+    slat = st.number_input("Latitude", value=float(r["lat_dec"] or 0.0), step=0.000001, format="%.8f")
+    slon = st.number_input("Longitude", value=float(r["long_dec"] or 0.0), step=0.000001, format="%.8f")
     col_a, col_b = st.columns(2)
     with col_a:
         if st.button("Batal", key="dlg_edit_site_cancel"):
@@ -392,7 +590,9 @@ def dlg_edit_site(sid: str, srow):
                     (sname.strip(), saddr.strip() or None, float(slat), float(slon), sid),
                 )
                 st.success("Site berhasil diubah.")
-                _refresh_and_rerun()
+                # Label from/to di load_links ikut memuat site_name,
+                # jadi cache links harus dibuang juga saat site diubah
+                _refresh_and_rerun(load_sites, load_links)
             except Exception as e:
                 st.error(f"Gagal mengubah site: {e}")
 
@@ -409,10 +609,9 @@ def dlg_delete_sites(del_sids: list):
     with col_b:
         if st.button("Hapus", type="primary", key="dlg_delete_site_confirm"):
             try:
-                for sid in del_sids:
-                    run_sql("DELETE FROM sites WHERE site_id=%s", (sid,))
+                run_sql("DELETE FROM sites WHERE site_id = ANY(%s)", (list(map(str, del_sids)),))
                 st.success("Site terhapus.")
-                _refresh_and_rerun()
+                _refresh_and_rerun(load_sites)
             except Exception as e:
                 st.error(f"Gagal menghapus site: {e}")
 
@@ -428,14 +627,10 @@ with st.expander("Kelola Sites", expanded=False):
             dlg_add_site()
 
     # Filtered view
-    sites_view = sites_df.copy()
-    if not sites_view.empty and s_q:
+    sites_view = sites_df
+    if not sites_view.empty and s_q and len(str(s_q).strip()) >= 2:
         ql = str(s_q).strip().lower()
-        sites_view = sites_view[
-            sites_view["site_id"].astype(str).str.lower().str.contains(ql)
-            | sites_view["site_name"].astype(str).str.lower().str.contains(ql)
-            | sites_view["site_address"].astype(str).str.lower().str.contains(ql)
-        ]
+        sites_view = sites_view[_search_index(sites_df, ("site_id", "site_name", "site_address")).str.contains(ql, regex=False, na=False)]
 
     stable, sactions = st.columns([3, 1])
     with stable:
@@ -443,7 +638,7 @@ with st.expander("Kelola Sites", expanded=False):
             st.info("Tidak ada data site yang cocok.")
         else:
             st.dataframe(
-                sites_view.sort_values(["site_name", "site_id"], kind="stable"),
+                sites_view,
                 use_container_width=True,
                 hide_index=True,
                 height=320,
@@ -461,15 +656,16 @@ with st.expander("Kelola Sites", expanded=False):
         if sites_df.empty:
             st.caption("Tambahkan site terlebih dahulu.")
         else:
+            site_labels = _build_site_label_map(sites_df)
             pick_site = st.selectbox(
                 "Pilih site",
-                options=[None] + list(sites_df["site_id"].astype(str)),
-                format_func=lambda v: "— pilih —" if v is None else f"{v} — {sites_df.loc[sites_df.site_id==v, 'site_name'].values[0] if (sites_df.site_id==v).any() else ''}",
+                options=[None] + list(site_labels.keys()),
+                format_func=lambda v: "— pilih —" if v is None else site_labels[v],
                 key="sites_pick_action",
             )
             if st.button("Ubah", disabled=pick_site is None, use_container_width=True, key="btn_open_edit_site"):
                 if pick_site is not None:
-                    srow = sites_df.loc[sites_df.site_id == pick_site].iloc[0]
+                    srow = _sites_by_id(sites_df).loc[str(pick_site)]
                     dlg_edit_site(pick_site, srow)
             if st.button("Hapus", disabled=pick_site is None, use_container_width=True, key="btn_open_delete_site"):
                 if pick_site is not None:
@@ -478,25 +674,14 @@ with st.expander("Kelola Sites", expanded=False):
 # -------------------------------
 # Kelola Links (CRUD)
 # -------------------------------
-def _build_client_map(df: pd.DataFrame):
-    return {int(r.client_id): str(r.client_name) for _, r in df.iterrows()} if not df.empty else {}
-
-def _build_site_label_map(df: pd.DataFrame):
-    if df.empty:
-        return {}
-    m = {}
-    for _, r in df.iterrows():
-        sid = str(r["site_id"])
-        label = f"{sid} — {r['site_name']}" if pd.notna(r.get("site_name")) else sid
-        m[sid] = label
-    return m
-
 @st.dialog("Tambah Link")
 def dlg_add_link(client_map, site_label_map):
+    client_ids, _ = _keys_and_index(client_map)
+    site_ids, _ = _keys_and_index(site_label_map)
     appl_id = st.text_input("Application ID", placeholder="mis: 2460852112021")
-    client_id = st.selectbox("Client", options=list(client_map.keys()), format_func=lambda v: f"{v} — {client_map[v]}", key="addlink_client")
-    site_from = st.selectbox("Site From", options=list(site_label_map.keys()), format_func=lambda v: site_label_map[v], key="addlink_from")
-    site_to = st.selectbox("Site To", options=list(site_label_map.keys()), format_func=lambda v: site_label_map[v], key="addlink_to")
+    client_id = st.selectbox("Client", options=client_ids, format_func=lambda v: f"{v} — {client_map[v]}", key="addlink_client")
+    site_from = st.selectbox("Site From", options=site_ids, format_func=lambda v: site_label_map[v], key="addlink_from")
+    site_to = st.selectbox("Site To", options=site_ids, format_func=lambda v: site_label_map[v], key="addlink_to")
     col1, col2, col3 = st.columns(3)
     with col1:
         freq = st.number_input("Freq (MHz)", value=0, step=1, min_value=0, key="addlink_freq")
@@ -527,8 +712,8 @@ def dlg_add_link(client_map, site_label_map):
                         """,
                         (appl_id.strip(), int(client_id), str(site_from), str(site_to), int(freq), int(freq_pair), int(bandwidth), model.strip() or None),
                     )
-                except Exception:
-                    # Perbaiki sequence yang mungkin tertinggal karena insert manual
+                except psycopg2.errors.UniqueViolation:
+                    # Sequence tertinggal setelah insert manual; perbaiki lalu ulangi sekali
                     reseed_links_id_sequence()
                     run_sql(
                         """
@@ -538,24 +723,28 @@ def dlg_add_link(client_map, site_label_map):
                         (appl_id.strip(), int(client_id), str(site_from), str(site_to), int(freq), int(freq_pair), int(bandwidth), model.strip() or None),
                     )
                 st.success("Link berhasil ditambah.")
-                _refresh_and_rerun()
+                _refresh_and_rerun(load_links)
             except Exception as e:
                 st.error(f"Gagal menambah link: {e}")
 
 @st.dialog("Ubah Link")
 def dlg_edit_link(link_row, client_map, site_label_map):
-    appl_id = st.text_input("Application ID", value=str(link_row.get("appl_id") or ""), key="editlink_appl")
-    client_id = st.selectbox("Client", options=list(client_map.keys()), index=list(client_map.keys()).index(int(link_row["client_id"])), format_func=lambda v: f"{v} — {client_map[v]}", key="editlink_client")
-    site_from = st.selectbox("Site From", options=list(site_label_map.keys()), index=list(site_label_map.keys()).index(str(link_row["site_from"])), format_func=lambda v: site_label_map[v], key="editlink_from")
-    site_to = st.selectbox("Site To", options=list(site_label_map.keys()), index=list(site_label_map.keys()).index(str(link_row["site_to"])), format_func=lambda v: site_label_map[v], key="editlink_to")
+    # Konversi sekali ke dict polos (NaN -> None), akses berikutnya tanpa dispatch pandas
+    r = {k: (None if pd.isna(v) else v) for k, v in link_row.items()}
+    appl_id = st.text_input("Application ID", value=str(r["appl_id"] or ""), key="editlink_appl")
+    client_ids, client_idx = _keys_and_index(client_map)
+    site_ids, site_idx = _keys_and_index(site_label_map)
+    client_id = st.selectbox("Client", options=client_ids, index=client_idx[int(r["client_id"])], format_func=lambda v: f"{v} — {client_map[v]}", key="editlink_client")
+    site_from = st.selectbox("Site From", options=site_ids, index=site_idx[str(r["site_from"])], format_func=lambda v: site_label_map[v], key="editlink_from")
+    site_to = st.selectbox("Site To", options=site_ids, index=site_idx[str(r["site_to"])], format_func=lambda v: site_label_map[v], key="editlink_to")
     col1, col2, col3 = st.columns(3)
     with col1:
-        freq = st.number_input("Freq (MHz)", value=int(link_row.get("freq") or 0), step=1, min_value=0, key="editlink_freq")
+        freq = st.number_input("Freq (MHz)", value=int(r["freq"] or 0), step=1, min_value=0, key="editlink_freq")
     with col2:
-        freq_pair = st.number_input("Freq Pair (MHz)", value=int(link_row.get("freq_pair") or 0), step=1, min_value=0, key="editlink_freqpair")
+        freq_pair = st.number_input("Freq Pair (MHz)", value=int(r["freq_pair"] or 0), step=1, min_value=0, key="editlink_freqpair")
     with col3:
-        bandwidth = st.number_input("Bandwidth (kHz)", value=int(link_row.get("bandwidth") or 0), step=1000, min_value=0, key="editlink_bw")
-    model = st.text_input("Model", value=str(link_row.get("model") or ""), key="editlink_model")
+        bandwidth = st.number_input("Bandwidth (kHz)", value=int(r["bandwidth"] or 0), step=1000, min_value=0, key="editlink_bw")
+    model = st.text_input("Model", value=str(r["model"] or ""), key="editlink_model")
 
     a, b = st.columns(2)
     with a:
@@ -572,10 +761,10 @@ def dlg_edit_link(link_row, client_map, site_label_map):
                     UPDATE links SET appl_id=%s, client_id=%s, site_from=%s, site_to=%s, freq=%s, freq_pair=%s, bandwidth=%s, model=%s
                     WHERE link_id=%s
                     """,
-                    (appl_id.strip(), int(client_id), str(site_from), str(site_to), int(freq), int(freq_pair), int(bandwidth), model.strip() or None, int(link_row["link_id"]))
+                    (appl_id.strip(), int(client_id), str(site_from), str(site_to), int(freq), int(freq_pair), int(bandwidth), model.strip() or None, int(r["link_id"]))
                 )
                 st.success("Link berhasil diubah.")
-                _refresh_and_rerun()
+                _refresh_and_rerun(load_links)
             except Exception as e:
                 st.error(f"Gagal mengubah link: {e}")
 
@@ -591,10 +780,9 @@ def dlg_delete_links(del_ids: list):
     with b:
         if st.button("Hapus", type="primary", key="dlg_delete_links_confirm"):
             try:
-                for lid in del_ids:
-                    run_sql("DELETE FROM links WHERE link_id=%s", (int(lid),))
+                run_sql("DELETE FROM links WHERE link_id = ANY(%s)", (list(map(int, del_ids)),))
                 st.success("Link terhapus.")
-                _refresh_and_rerun()
+                _refresh_and_rerun(load_links)
             except Exception as e:
                 st.error(f"Gagal menghapus link: {e}")
 
@@ -616,34 +804,20 @@ with st.expander("Kelola Links", expanded=False):
             else:
                 dlg_add_link(client_map, site_label_map)
 
-    links_view = links_df.copy()
+    # Filter client dieksekusi server-side (pakai index), bukan mask pandas
+    links_view = load_links(**params, client_id=int(lk_client)) if lk_client is not None else links_df
     if not links_view.empty:
-        if lk_client is not None:
-            links_view = links_view[links_view["client_id"] == int(lk_client)]
-        if lk_q:
+        if lk_q and (lk_client is not None or len(str(lk_q).strip()) >= 2):
             ql = str(lk_q).strip().lower()
-            # Build lookup label columns for sites
-            lab_map = site_label_map
-            links_view = links_view.copy()
-            links_view["from_label"] = links_view["site_from"].astype(str).map(lab_map)
-            links_view["to_label"] = links_view["site_to"].astype(str).map(lab_map)
-            links_view = links_view[
-                links_view["appl_id"].astype(str).str.lower().str.contains(ql)
-                | links_view["model"].astype(str).str.lower().str.contains(ql)
-                | links_view["from_label"].astype(str).str.lower().str.contains(ql)
-                | links_view["to_label"].astype(str).str.lower().str.contains(ql)
-            ]
+            links_view = links_view[_search_index(links_view, ("appl_id", "model", "from_label", "to_label")).str.contains(ql, regex=False, na=False)]
 
     ltable, lactions = st.columns([4, 1])
     with ltable:
         if links_view.empty:
             st.info("Tidak ada link yang cocok.")
         else:
-            disp = links_view.copy()
-            disp["from_label"] = disp["site_from"].astype(str).map(site_label_map)
-            disp["to_label"] = disp["site_to"].astype(str).map(site_label_map)
             st.dataframe(
-                disp[["link_id", "appl_id", "client_id", "from_label", "to_label", "freq", "freq_pair", "bandwidth", "model"]].sort_values("link_id"),
+                links_view[["link_id", "appl_id", "client_id", "from_label", "to_label", "freq", "freq_pair", "bandwidth", "model"]],
                 use_container_width=True,
                 hide_index=True,
                 height=320,
@@ -701,8 +875,26 @@ with st.expander("📥 Import Data dari CSV", expanded=False):
     
     if uploaded_file is not None:
         try:
-            # Baca CSV
-            import_df = pd.read_csv(uploaded_file)
+            # Baca CSV: hanya kolom yang dipakai, dengan engine pyarrow
+            # (parsing multi-thread) bila terpasang; selain itu engine default
+            import_cols = ["CLNT_NAME", "STN_NAME", "STN_ADDR", "LAT_DEC", "LONG_DEC",
+                           "STASIUN_LAWAN", "TO_LAT_DEC", "TO_LONG_DEC",
+                           "APPL_ID", "FREQ", "FREQ_PAIR", "BWIDTH", "EQ_MDL"]
+            header_cols = pd.read_csv(uploaded_file, nrows=0).columns
+            uploaded_file.seek(0)
+            usecols = [c for c in import_cols if c in header_cols]
+            try:
+                import_df = pd.read_csv(uploaded_file, engine="pyarrow", usecols=usecols)
+            except (ImportError, ValueError):
+                uploaded_file.seek(0)
+                import_df = pd.read_csv(uploaded_file, usecols=usecols)
+            # Koersi tipe sekali secara vektor; fase clients/sites/links tinggal pakai
+            for c in ("FREQ", "FREQ_PAIR", "BWIDTH"):
+                if c in import_df.columns:
+                    import_df[c] = pd.to_numeric(import_df[c], errors="coerce").astype("Int64")
+            for c in ("APPL_ID", "EQ_MDL", "CLNT_NAME", "STN_NAME", "STASIUN_LAWAN"):
+                if c in import_df.columns:
+                    import_df[c] = import_df[c].astype("string").str.strip()
             st.success(f"File berhasil dibaca: {len(import_df)} baris data")
             
             # Tampilkan preview
@@ -724,15 +916,20 @@ with st.expander("📥 Import Data dari CSV", expanded=False):
                 st.write(f"**Clients ditemukan ({len(unique_clients)}):** {', '.join(unique_clients[:5])}{'...' if len(unique_clients) > 5 else ''}")
                 
                 # 2. Sites (gabungan dari STN_NAME dan STASIUN_LAWAN)
-                sites_from = import_df[["STN_NAME", "STN_ADDR", "LAT_DEC", "LONG_DEC"]].copy()
-                sites_from.columns = ["site_name", "site_address", "lat", "lon"]
-                
-                sites_to = import_df[["STASIUN_LAWAN", "TO_LAT_DEC", "TO_LONG_DEC"]].copy()
-                sites_to.columns = ["site_name", "lat", "lon"]
+                sites_from = import_df[["STN_NAME", "STN_ADDR", "LAT_DEC", "LONG_DEC"]].rename(
+                    columns={"STN_NAME": "site_name", "STN_ADDR": "site_address", "LAT_DEC": "lat", "LONG_DEC": "lon"}
+                )
+
+                sites_to = import_df[["STASIUN_LAWAN", "TO_LAT_DEC", "TO_LONG_DEC"]].rename(
+                    columns={"STASIUN_LAWAN": "site_name", "TO_LAT_DEC": "lat", "TO_LONG_DEC": "lon"}
+                )
                 sites_to["site_address"] = None
                 sites_to = sites_to[["site_name", "site_address", "lat", "lon"]]
-                
-                all_sites = pd.concat([sites_from, sites_to], ignore_index=True).drop_duplicates(subset=["site_name"])
+
+                all_sites = pd.concat([sites_from, sites_to], ignore_index=True, copy=False)
+                # category: dedup di-hash lewat kode integer, bukan string Python
+                all_sites["site_name"] = all_sites["site_name"].astype("category")
+                all_sites = all_sites.drop_duplicates(subset=["site_name"], ignore_index=True)
                 st.write(f"**Sites ditemukan ({len(all_sites)}):** {', '.join(all_sites['site_name'].head(5).tolist())}{'...' if len(all_sites) > 5 else ''}")
                 
                 # 3. Links
@@ -750,106 +947,76 @@ with st.expander("📥 Import Data dari CSV", expanded=False):
                         progress = st.progress(0, text="Memulai import...")
                         
                         try:
-                            # Step 1: Import Clients
-                            progress.progress(10, text="Mengimport clients...")
-                            client_id_map = {}  # Mapping nama client ke ID
-                            
-                            for cname in unique_clients:
-                                # Cek apakah sudah ada
-                                existing = run_sql(
-                                    "SELECT client_id FROM clients WHERE client_name = %s",
-                                    (cname,), fetch="one"
-                                )
-                                if existing:
-                                    client_id_map[cname] = existing["client_id"]
-                                else:
-                                    # Insert baru
-                                    reseed_clients_id_sequence()
-                                    run_sql(
-                                        "INSERT INTO clients(client_name) VALUES (%s)",
-                                        (cname,)
-                                    )
-                                    new_client = run_sql(
-                                        "SELECT client_id FROM clients WHERE client_name = %s",
-                                        (cname,), fetch="one"
-                                    )
-                                    if new_client:
-                                        client_id_map[cname] = new_client["client_id"]
-                            
-                            st.write(f"✅ Clients: {len(client_id_map)} imported/found")
-                            
-                            # Step 2: Import Sites
-                            progress.progress(40, text="Mengimport sites...")
-                            sites_imported = 0
-                            sites_skipped = 0
-                            
-                            for _, site_row in all_sites.iterrows():
-                                site_id = str(site_row["site_name"]).strip()
-                                site_name = str(site_row["site_name"]).strip()
-                                site_addr = str(site_row["site_address"]) if pd.notna(site_row["site_address"]) else None
-                                lat = float(site_row["lat"]) if pd.notna(site_row["lat"]) else None
-                                lon = float(site_row["lon"]) if pd.notna(site_row["lon"]) else None
-                                
-                                # Cek apakah sudah ada
-                                existing = run_sql(
-                                    "SELECT site_id FROM sites WHERE site_id = %s",
-                                    (site_id,), fetch="one"
-                                )
-                                if existing:
-                                    sites_skipped += 1
-                                else:
-                                    run_sql(
-                                        "INSERT INTO sites(site_id, site_name, site_address, lat_dec, long_dec) VALUES (%s, %s, %s, %s, %s)",
-                                        (site_id, site_name, site_addr, lat, lon)
-                                    )
-                                    sites_imported += 1
-                            
-                            st.write(f"✅ Sites: {sites_imported} imported, {sites_skipped} skipped (sudah ada)")
-                            
-                            # Step 3: Import Links
-                            progress.progress(70, text="Mengimport links...")
-                            links_imported = 0
-                            links_skipped = 0
-                            
-                            for _, link_row in import_df.iterrows():
-                                appl_id = str(link_row.get("APPL_ID", "")) if pd.notna(link_row.get("APPL_ID")) else None
-                                client_name = str(link_row["CLNT_NAME"]) if pd.notna(link_row["CLNT_NAME"]) else None
-                                site_from = str(link_row["STN_NAME"]).strip() if pd.notna(link_row["STN_NAME"]) else None
-                                site_to = str(link_row["STASIUN_LAWAN"]).strip() if pd.notna(link_row["STASIUN_LAWAN"]) else None
-                                freq = int(link_row["FREQ"]) if pd.notna(link_row.get("FREQ")) else None
-                                freq_pair = int(link_row["FREQ_PAIR"]) if pd.notna(link_row.get("FREQ_PAIR")) else None
-                                bandwidth = int(link_row["BWIDTH"]) if pd.notna(link_row.get("BWIDTH")) else None
-                                model = str(link_row["EQ_MDL"]) if pd.notna(link_row.get("EQ_MDL")) else None
-                                
-                                client_id = client_id_map.get(client_name) if client_name else None
-                                
-                                if not site_from or not site_to or not client_id:
-                                    links_skipped += 1
-                                    continue
-                                
-                                # Cek apakah link sudah ada (berdasarkan appl_id + site_from + site_to)
-                                existing = run_sql(
-                                    "SELECT link_id FROM links WHERE appl_id = %s AND site_from = %s AND site_to = %s",
-                                    (appl_id, site_from, site_to), fetch="one"
-                                )
-                                if existing:
-                                    links_skipped += 1
-                                else:
-                                    reseed_links_id_sequence()
-                                    run_sql(
-                                        "INSERT INTO links(appl_id, client_id, site_from, site_to, freq, freq_pair, bandwidth, model) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
-                                        (appl_id, client_id, site_from, site_to, freq, freq_pair, bandwidth, model)
-                                    )
-                                    links_imported += 1
-                            
-                            st.write(f"✅ Links: {links_imported} imported, {links_skipped} skipped")
+                            # Seluruh import berjalan di satu koneksi dan satu
+                            # transaksi: semua masuk, atau tidak sama sekali
+                            pool = get_pool(**params)
+                            conn = pool.getconn()
+                            try:
+                                with conn.cursor() as cur:
+                                    # Step 1: Import Clients
+                                    progress.progress(10, text="Mengimport clients...")
+                                    client_id_map, clients_new = _import_clients(cur, unique_clients)
+                                    st.write(f"✅ Clients: {len(client_id_map)} imported/found")
+
+                                    # Step 2: Import Sites (COPY ke staging + ON CONFLICT DO NOTHING)
+                                    progress.progress(40, text="Mengimport sites...")
+                                    coord_ok = _valid_latlon_mask(all_sites["lat"], all_sites["lon"])
+                                    sites_invalid = int((~coord_ok).sum())
+                                    if sites_invalid:
+                                        st.write(f"⚠️ Sites: {sites_invalid} baris dilewati (koordinat tidak valid)")
+                                        all_sites = all_sites[coord_ok]
+                                    site_ids = all_sites["site_name"].astype(str).str.strip()
+                                    sites_stage = pd.DataFrame({
+                                        "site_id": site_ids,
+                                        "site_name": site_ids,
+                                        "site_address": all_sites["site_address"],
+                                        "lat_dec": pd.to_numeric(all_sites["lat"], errors="coerce"),
+                                        "long_dec": pd.to_numeric(all_sites["lon"], errors="coerce"),
+                                    }).drop_duplicates(subset=["site_id"])
+                                    sites_imported = copy_sites(cur, sites_stage)
+                                    sites_skipped = len(sites_stage) - sites_imported
+
+                                    st.write(f"✅ Sites: {sites_imported} imported, {sites_skipped} skipped (sudah ada)")
+
+                                    # Step 3: Import Links (COPY ke staging + anti-join di server)
+                                    progress.progress(70, text="Mengimport links...")
+                                    links_cand = _links_candidates(import_df, client_id_map)
+                                    links_imported = 0
+                                    if not links_cand.empty:
+                                        # Satu query ANY() untuk semua kandidat; set lookup
+                                        # in-memory memangkas payload COPY
+                                        cur.execute(
+                                            "SELECT appl_id, site_from, site_to FROM links WHERE appl_id = ANY(%s)",
+                                            (links_cand["appl_id"].dropna().unique().tolist(),),
+                                        )
+                                        existing_keys = {(r["appl_id"], r["site_from"], r["site_to"]) for r in cur.fetchall()}
+                                        keys = list(zip(links_cand["appl_id"], links_cand["site_from"], links_cand["site_to"]))
+                                        links_cand = links_cand[[k not in existing_keys for k in keys]]
+                                    if not links_cand.empty:
+                                        cur.execute(RESEED_LINKS_SQL)
+                                        links_imported = copy_links(cur, links_cand)
+                                    links_skipped = len(import_df) - links_imported
+
+                                    st.write(f"✅ Links: {links_imported} imported, {links_skipped} skipped")
+                                conn.commit()
+                            except Exception:
+                                conn.rollback()
+                                raise
+                            finally:
+                                pool.putconn(conn)
                             
                             progress.progress(100, text="Selesai!")
                             st.success("🎉 Import selesai! Data berhasil dimasukkan ke database.")
                             st.balloons()
                             
-                            # Refresh data
-                            load_data.clear()
+                            # Refresh hanya cache tabel yang benar-benar menerima
+                            # baris baru; tabel lain tetap terlayani dari cache
+                            if clients_new:
+                                load_clients.clear()
+                            if sites_imported:
+                                load_sites.clear()
+                            if links_imported:
+                                load_links.clear()
                             st.rerun()
                             
                         except Exception as e:
@@ -859,214 +1026,299 @@ with st.expander("📥 Import Data dari CSV", expanded=False):
         except Exception as e:
             st.error(f"Gagal membaca file CSV: {e}")
 
-if selected_client is not None and not links_df.empty:
-    links_df = links_df[links_df["client_id"] == selected_client]
+if selected_client is not None:
+    links_df = load_links(**params, client_id=int(selected_client))
 
 # Gabungkan koordinat site_from dan site_to
 if sites_df.empty:
     st.warning("Data sites kosong.")
     st.stop()
 
-site_cols = ["site_id", "site_name", "lat_dec", "long_dec"]
-sites_min = sites_df[site_cols].copy()
-sites_min.rename(columns={"lat_dec": "lat", "long_dec": "lon"}, inplace=True)
-
-links_merge = links_df.merge(
-    sites_min.add_prefix("from_"), left_on="site_from", right_on="from_site_id", how="left"
-).merge(
-    sites_min.add_prefix("to_"), left_on="site_to", right_on="to_site_id", how="left"
-).merge(
-    clients_df[["client_id", "client_name"]], on="client_id", how="left"
-)
-
-# Buat data untuk layer
-sites_points = sites_min.rename(columns={"site_id": "id", "site_name": "name"})
-
 def _spread_overlaps(df_sites: pd.DataFrame, dist_m: float = 18.0) -> pd.DataFrame:
-    # Sebar titik yang punya lat/lon identik dengan offset kecil berjari-jari dist_m
+    # Sebar titik yang punya lat/lon identik dengan offset kecil berjari-jari dist_m.
+    # Posisi dalam grup dihitung via cumcount/transform, offset melingkar via NumPy.
     if df_sites.empty:
         return df_sites
-    rows = []
-    # Kelompokkan berdasarkan koordinat asli
-    grouped = df_sites.groupby(["lat", "lon"], dropna=False, as_index=False)
-    for (lat, lon), group in grouped:
-        n = len(group)
-        if n == 1 or not sep_dup:
-            for _, r in group.iterrows():
-                rr = r.to_dict()
-                rr.update({"orig_lat": lat, "orig_lon": lon, "group_size": n})
-                rows.append(rr)
-            continue
-        # Hitung offset
-        lat_rad = math.radians(lat if pd.notna(lat) else 0.0)
+    df = df_sites.copy()
+    grouped = df.groupby(["lat", "lon"], dropna=False, sort=False)
+    i = grouped.cumcount().to_numpy()
+    n = grouped["lat"].transform("size").to_numpy()
+    lat = df["lat"].to_numpy(dtype=np.float64)
+    lon = df["lon"].to_numpy(dtype=np.float64)
+    df["orig_lat"] = lat
+    df["orig_lon"] = lon
+    df["group_size"] = n
+    if dist_m > 0:
+        multi = n > 1
+        lat_rad = np.radians(np.nan_to_num(lat))
         dlat = dist_m / 111320.0
-        dlon_unit = dist_m / max(1e-6, (111320.0 * max(0.15, math.cos(lat_rad))))
-        for i, (_, r) in enumerate(group.iterrows()):
-            # Sebar melingkar
-            ang = 2 * math.pi * i / n
-            lat_off = lat + dlat * math.sin(ang)
-            lon_off = lon + dlon_unit * math.cos(ang)
-            rr = r.to_dict()
-            rr["lat"], rr["lon"] = lat_off, lon_off
-            rr.update({"orig_lat": lat, "orig_lon": lon, "group_size": n})
-            rows.append(rr)
-    return pd.DataFrame(rows)
-
-sites_vis = _spread_overlaps(sites_points, float(sep_dist_m) if sep_dup else 0.0)
-
-links_paths = links_merge.dropna(subset=["from_lat", "from_lon", "to_lat", "to_lon"]).copy()
+        dlon_unit = dist_m / np.maximum(1e-6, 111320.0 * np.maximum(0.15, np.cos(lat_rad)))
+        ang = 2 * np.pi * i / np.maximum(n, 1)
+        df["lat"] = np.where(multi, lat + dlat * np.sin(ang), lat)
+        df["lon"] = np.where(multi, lon + dlon_unit * np.cos(ang), lon)
+    return df
 
 def _spread_overlapping_links(df: pd.DataFrame, offset_m: float = 30.0) -> pd.DataFrame:
     """
     Untuk link yang punya koordinat from-to identik, buat kurva Bezier yang berbeda
     sehingga setiap link tampil sebagai garis melengkung yang bertemu di titik yang sama.
     offset_m: jarak control point dari garis lurus dalam meter.
+    Seluruh perhitungan dilakukan vektor di NumPy (tanpa loop per grup).
     """
     if df.empty:
         return df
-    
-    # Buat key unik untuk setiap pasangan from-to (urutan penting karena directed)
+
     df = df.copy()
-    df["_link_key"] = df.apply(
-        lambda r: f"{r['from_lat']:.8f},{r['from_lon']:.8f}->{r['to_lat']:.8f},{r['to_lon']:.8f}",
-        axis=1
+    # Kelompokkan per pasangan koordinat from-to (urutan penting karena directed)
+    grouped = df.groupby(["from_lat", "from_lon", "to_lat", "to_lon"], sort=False)
+    idx = grouped.cumcount().to_numpy()
+    n = grouped["from_lat"].transform("size").to_numpy()
+
+    lat1 = df["from_lat"].to_numpy(dtype=np.float64)
+    lon1 = df["from_lon"].to_numpy(dtype=np.float64)
+    lat2 = df["to_lat"].to_numpy(dtype=np.float64)
+    lon2 = df["to_lon"].to_numpy(dtype=np.float64)
+
+    # Konversi ke meter untuk perhitungan
+    lat_mid = (lat1 + lat2) / 2
+    lat_to_m = 111320.0
+    lon_to_m = lat_to_m * np.maximum(0.15, np.cos(np.radians(lat_mid)))
+
+    # Vektor arah dari from ke to, panjang dalam meter
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    length_m = np.maximum(np.sqrt((dlat * lat_to_m) ** 2 + (dlon * lon_to_m) ** 2), 1.0)
+
+    # Unit vector perpendicular (tegak lurus) untuk control point
+    perp_lat_deg = (-dlon * lon_to_m / length_m)
+    perp_lon_deg = (dlat * lat_to_m / length_m) / lon_to_m
+    perp_lat_deg = perp_lat_deg / lat_to_m
+
+    # Offset dari tengah: -((n-1)/2), ..., 0, ..., ((n-1)/2)
+    curve_distance = (idx - (n - 1) / 2.0) * offset_m * 1.5  # Lebih besar agar kurva terlihat
+    ctrl_lat = lat_mid + curve_distance * perp_lat_deg
+    ctrl_lon = (lon1 + lon2) / 2 + curve_distance * perp_lon_deg
+
+    # Titik awal dan akhir tetap sama (tidak di-offset)
+    df["offset_from_lat"] = lat1
+    df["offset_from_lon"] = lon1
+    df["offset_to_lat"] = lat2
+    df["offset_to_lon"] = lon2
+    df["curve_offset"] = np.where(n == 1, 0.0, curve_distance)
+    df["ctrl_lat"] = ctrl_lat
+    df["ctrl_lon"] = ctrl_lon
+
+    # Quadratic Bezier: B(t) = (1-t)^2*P0 + 2(1-t)t*P1 + t^2*P2, 13 titik per kurva
+    t = np.linspace(0.0, 1.0, 13)
+    w0 = (1 - t) ** 2
+    w1 = 2 * (1 - t) * t
+    w2 = t ** 2
+    b_lat = np.outer(lat1, w0) + np.outer(ctrl_lat, w1) + np.outer(lat2, w2)
+    b_lon = np.outer(lon1, w0) + np.outer(ctrl_lon, w1) + np.outer(lon2, w2)
+    # 6 desimal ≈ 0.1 m — cukup presisi, dan repr float pendek memangkas
+    # ukuran payload yang diserialisasi ke browser
+    pts = np.round(np.stack([b_lon, b_lat], axis=2), 6)  # [lon, lat] per titik
+    df["curve_points"] = [p.tolist() if nn > 1 else None for p, nn in zip(pts, n)]
+    return df
+
+@st.cache_data(
+    show_spinner=False,
+    max_entries=8,
+    hash_funcs={pd.DataFrame: _df_cache_key},
+)
+def compute_layers(sites_df, links_df, clients_df, sep_dist: float, link_offset: float):
+    """Pra-proses semua frame layer peta (merge koordinat, spread overlap,
+    kolom path, panah arah, pusat peta). Di-cache supaya rerun akibat
+    interaksi peta tidak mengulang transformasi data."""
+    site_cols = ["site_id", "site_name", "lat_dec", "long_dec"]
+    sites_min = sites_df[site_cols].copy()
+    sites_min.rename(columns={"lat_dec": "lat", "long_dec": "lon"}, inplace=True)
+
+    links_merge = links_df.merge(
+        sites_min.add_prefix("from_"), left_on="site_from", right_on="from_site_id", how="left"
+    ).merge(
+        sites_min.add_prefix("to_"), left_on="site_to", right_on="to_site_id", how="left"
+    ).merge(
+        clients_df[["client_id", "client_name"]], on="client_id", how="left"
     )
-    
-    # Group by link_key dan hitung kurva untuk masing-masing
-    grouped = df.groupby("_link_key", as_index=False)
-    
-    new_rows = []
-    for key, group in grouped:
-        n = len(group)
-        first_row = group.iloc[0]
-        lat1, lon1 = float(first_row["from_lat"]), float(first_row["from_lon"])
-        lat2, lon2 = float(first_row["to_lat"]), float(first_row["to_lon"])
-        
-        # Konversi ke meter untuk perhitungan
-        lat_mid = (lat1 + lat2) / 2
-        lat_to_m = 111320.0
-        lon_to_m = 111320.0 * max(0.15, math.cos(math.radians(lat_mid)))
-        
-        # Hitung vektor arah dari from ke to
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        
-        # Panjang vektor dalam meter
-        length_m = math.sqrt((dlat * lat_to_m)**2 + (dlon * lon_to_m)**2)
-        if length_m < 1:
-            length_m = 1
-        
-        # Unit vector perpendicular (tegak lurus) untuk control point
-        perp_lat = -dlon * lon_to_m / length_m
-        perp_lon = dlat * lat_to_m / length_m
-        perp_lat_deg = perp_lat / lat_to_m
-        perp_lon_deg = perp_lon / lon_to_m
-        
-        for i, (_, r) in enumerate(group.iterrows()):
-            rr = r.to_dict()
-            
-            # Titik awal dan akhir tetap sama (tidak di-offset)
-            rr["offset_from_lat"] = lat1
-            rr["offset_from_lon"] = lon1
-            rr["offset_to_lat"] = lat2
-            rr["offset_to_lon"] = lon2
-            
-            if n == 1:
-                # Single link, tidak perlu kurva
-                rr["curve_offset"] = 0
-                rr["curve_points"] = None
-            else:
-                # Multiple links, buat kurva dengan control point berbeda
-                # Offset dari tengah: -((n-1)/2), ..., 0, ..., ((n-1)/2)
-                offset_idx = i - (n - 1) / 2.0
-                curve_distance = offset_idx * offset_m * 1.5  # Lebih besar agar kurva terlihat
-                
-                # Hitung control point di tengah garis
-                mid_lat = (lat1 + lat2) / 2 + curve_distance * perp_lat_deg
-                mid_lon = (lon1 + lon2) / 2 + curve_distance * perp_lon_deg
-                
-                rr["curve_offset"] = curve_distance
-                # Simpan control points untuk kurva quadratic Bezier
-                rr["ctrl_lat"] = mid_lat
-                rr["ctrl_lon"] = mid_lon
-                
-                # Generate multiple points untuk simulasi kurva
-                num_points = 12
-                curve_pts = []
-                for t in range(num_points + 1):
-                    t_val = t / num_points
-                    # Quadratic Bezier: B(t) = (1-t)²P0 + 2(1-t)tP1 + t²P2
-                    b_lat = (1-t_val)**2 * lat1 + 2*(1-t_val)*t_val * mid_lat + t_val**2 * lat2
-                    b_lon = (1-t_val)**2 * lon1 + 2*(1-t_val)*t_val * mid_lon + t_val**2 * lon2
-                    curve_pts.append([b_lon, b_lat])  # [lon, lat] for path
-                rr["curve_points"] = curve_pts
-            
-            new_rows.append(rr)
-    
-    result = pd.DataFrame(new_rows)
-    if "_link_key" in result.columns:
-        result = result.drop(columns=["_link_key"])
-    return result
-
-# Terapkan spread untuk link yang overlap (menggunakan nilai dari sidebar)
-links_paths = _spread_overlapping_links(links_paths, offset_m=float(link_offset_m))
-
-links_paths["path"] = links_paths.apply(
-    lambda r: r["curve_points"] if r.get("curve_points") is not None else [
-        [float(r["offset_from_lon"]), float(r["offset_from_lat"])],
-        [float(r["offset_to_lon"]), float(r["offset_to_lat"])],
-    ],
-    axis=1,
+
+    # Buat data untuk layer; copy=False berbagi blok data dengan sites_min
+    # (downstream hanya membaca — _spread_overlaps meng-copy sendiri sebelum menulis)
+    sites_points = sites_min.rename(columns={"site_id": "id", "site_name": "name"}, copy=False)
+
+    sites_vis = _spread_overlaps(sites_points, sep_dist)
+
+    links_paths = links_merge.dropna(subset=["from_lat", "from_lon", "to_lat", "to_lon"]).copy()
+
+    # Terapkan spread untuk link yang overlap (menggunakan nilai dari sidebar)
+    links_paths = _spread_overlapping_links(links_paths, offset_m=link_offset)
+
+    # Path per link: curve_points kalau ada, selain itu garis lurus dua titik [lon, lat]
+    if not links_paths.empty:
+        straight = np.round(np.stack([
+            np.stack([links_paths["offset_from_lon"].to_numpy(np.float64), links_paths["offset_from_lat"].to_numpy(np.float64)], axis=1),
+            np.stack([links_paths["offset_to_lon"].to_numpy(np.float64), links_paths["offset_to_lat"].to_numpy(np.float64)], axis=1),
+        ], axis=1), 6)  # 6 desimal ≈ 0.1 m, repr pendek untuk payload
+        links_paths["path"] = [cp if cp is not None else s.tolist() for cp, s in zip(links_paths["curve_points"], straight)]
+    else:
+        links_paths["path"] = None
+
+
+    # Tentukan pusat peta
+    all_coords = pd.concat([
+        sites_points[["lat", "lon"]],
+        links_paths[["offset_from_lat", "offset_from_lon"]].rename(columns={"offset_from_lat": "lat", "offset_from_lon": "lon"}),
+        links_paths[["offset_to_lat", "offset_to_lon"]].rename(columns={"offset_to_lat": "lat", "offset_to_lon": "lon"}),
+    ], ignore_index=True)
+
+    if not all_coords.empty:
+        center_lat = float(all_coords["lat"].mean())
+        center_lon = float(all_coords["lon"].mean())
+    else:
+        center_lat, center_lon = -2.5, 118.0  # roughly Indonesia
+    return sites_points, sites_vis, links_paths, center_lat, center_lon
+
+# Seluruh pra-proses layer di-cache; rerun akibat interaksi peta tinggal
+# mengambil hasil dari cache selama data dan slider tidak berubah
+sites_points, sites_vis, links_paths, center_lat, center_lon = compute_layers(
+    sites_df, links_df, clients_df,
+    float(sep_dist_m) if sep_dup else 0.0,
+    float(link_offset_m),
 )
 
-# Hitung bearing (arah) dari from -> to dan titik panah di dekat tujuan
-def _bearing_deg(lat1, lon1, lat2, lon2):
-    # Rumus bearing initial (derajat) dari koordinat geodesi
-    phi1, phi2 = math.radians(lat1), math.radians(lat2)
-    dlon = math.radians(lon2 - lon1)
-    x = math.sin(dlon) * math.cos(phi2)
-    y = math.cos(phi1) * math.sin(phi2) - math.sin(phi1) * math.cos(phi2) * math.cos(dlon)
-    brng = math.degrees(math.atan2(x, y))
-    return (brng + 360.0) % 360.0
-
-def _interp_point(lat1, lon1, lat2, lon2, t=0.85):
-    # Interpolasi linear sederhana di ruang lat/lon (cukup untuk jarak pendek)
-    return (lat1 + (lat2 - lat1) * t, lon1 + (lon2 - lon1) * t)
-
-arrows = []
-for _, r in links_paths.iterrows():
-    # Gunakan koordinat offset agar panah berada di garis yang benar
-    lat1, lon1 = float(r["offset_from_lat"]), float(r["offset_from_lon"])
-    lat2, lon2 = float(r["offset_to_lat"]), float(r["offset_to_lon"]) 
-    ang = _bearing_deg(lat1, lon1, lat2, lon2)
-    alat, alon = _interp_point(lat1, lon1, lat2, lon2, 0.82)
-    arrows.append({
-        "lat": alat,
-        "lon": alon,
-        "angle": ang,
-        "label": "➤",  # panah unicode
-        "appl_id": r.get("appl_id"),
-    })
-arrows_df = pd.DataFrame(arrows)
-
-# Tentukan pusat peta
-all_coords = pd.concat([
-    sites_points[["lat", "lon"]],
-    links_paths[["offset_from_lat", "offset_from_lon"]].rename(columns={"offset_from_lat": "lat", "offset_from_lon": "lon"}),
-    links_paths[["offset_to_lat", "offset_to_lon"]].rename(columns={"offset_to_lat": "lat", "offset_to_lon": "lon"}),
-], ignore_index=True)
-
-if not all_coords.empty:
-    center_lat = float(all_coords["lat"].mean())
-    center_lon = float(all_coords["lon"].mean())
-else:
-    center_lat, center_lon = -2.5, 118.0  # roughly Indonesia
 
-if use_folium:
+# Overlay statis untuk peta folium: string konstan, cukup di-parse sekali di
+# level modul — bukan dirakit ulang setiap kali peta dibangun.
+# Efek hover garis link: satu aturan CSS :hover untuk semua garis, tanpa
+# listener mouseenter/mouseleave per polyline dan tanpa polling setTimeout
+_HOVER_EFFECT_HTML = """
+    <style>
+        /* Glow + penebalan saat hover, berlaku untuk semua garis link */
+        svg path.leaflet-interactive:hover,
+        svg polyline.leaflet-interactive:hover {
+            stroke-width: 12px !important;
+            stroke-opacity: 1 !important;
+            filter: drop-shadow(0 0 6px rgba(255,255,255,0.9)) drop-shadow(0 0 10px rgba(255,255,255,0.7));
+        }
+    </style>
+    <script>
+    (function() {
+        // Satu listener terdelegasi: naikkan z-order (appendChild) hanya
+        // untuk garis yang benar-benar di-hover. Digabung per frame lewat
+        // requestAnimationFrame supaya maksimal satu mutasi DOM per frame
+        // meski event mouseover datang beruntun saat pan
+        var pending = null;
+        document.addEventListener('mouseover', function(e) {
+            var el = e.target.closest && e.target.closest('path.leaflet-interactive');
+            if (!el || !el.parentNode) return;
+            if (pending !== null) cancelAnimationFrame(pending);
+            pending = requestAnimationFrame(function() {
+                pending = null;
+                if (el.parentNode) el.parentNode.appendChild(el);
+            });
+        }, true);
+    })();
+    </script>
+    """
+
+# Palet warna per operator — satu sumber kebenaran untuk legend, garis folium
+# (main/pulse/hover) dan warna RGBA di cabang pydeck
+OPERATOR_COLORS = {
+    'telkomsel': {'main': '#e4002b', 'pulse': '#ff4d6a', 'hover': '#ff6b7a'},  # Merah Telkomsel
+    'telkom': {'main': '#00529b', 'pulse': '#4d8fcc', 'hover': '#66a3d9'},  # Biru Telkom
+    'ioh': {'main': '#ffc600', 'pulse': '#ffe066', 'hover': '#ffdb4d'},  # Kuning/Emas IOH
+    'xlsmart': {'main': '#8b1a8b', 'pulse': '#c44dc4', 'hover': '#d966d9'},  # Ungu XLSmart
+}
+
+def _hex_to_rgba(hex_color: str, alpha: int = 200) -> list:
+    """'#rrggbb' -> [r, g, b, alpha] untuk get_color pydeck."""
+    h = hex_color.lstrip('#')
+    return [int(h[0:2], 16), int(h[2:4], 16), int(h[4:6], 16), alpha]
+
+# Legend operator di dalam peta; warna diisi dari OPERATOR_COLORS sekali
+# saat import modul, bukan dirakit ulang per rerun
+_LEGEND_TPL = """
+    <style>
+        #operator-legend {{
+            position: fixed;
+            bottom: 50px;
+            left: 10px;
+            z-index: 9999;
+            background: white;
+            padding: 12px 16px;
+            border-radius: 10px;
+            box-shadow: 0 2px 10px rgba(0,0,0,0.2);
+            font-family: Arial, sans-serif;
+            font-size: 12px;
+            max-width: 200px;
+        }}
+    </style>
+
+    <!-- Legend di bawah -->
+    <div id="operator-legend">
+        <div style="font-weight: bold; margin-bottom: 10px; font-size: 13px; color: #333; border-bottom: 2px solid #1a73e8; padding-bottom: 6px;">
+            📡 Legend Operator
+        </div>
+        <div style="display: flex; align-items: center; margin-bottom: 6px;">
+            <div style="width: 30px; height: 6px; background: {telkomsel}; border-radius: 3px; margin-right: 10px;"></div>
+            <span style="color: #333;">🔴 Telkomsel</span>
+        </div>
+        <div style="display: flex; align-items: center; margin-bottom: 6px;">
+            <div style="width: 30px; height: 6px; background: {telkom}; border-radius: 3px; margin-right: 10px;"></div>
+            <span style="color: #333;">🔵 Telkom</span>
+        </div>
+        <div style="display: flex; align-items: center; margin-bottom: 6px;">
+            <div style="width: 30px; height: 6px; background: {ioh}; border-radius: 3px; margin-right: 10px;"></div>
+            <span style="color: #333;">🟡 IOH</span>
+        </div>
+        <div style="display: flex; align-items: center;">
+            <div style="width: 30px; height: 6px; background: {xlsmart}; border-radius: 3px; margin-right: 10px;"></div>
+            <span style="color: #333;">🟣 XLSmart</span>
+        </div>
+    </div>
+    """
+_LEGEND_HTML = _LEGEND_TPL.format(**{k: v['main'] for k, v in OPERATOR_COLORS.items()})
+
+
+def _operator_keys(client_names: pd.Series) -> np.ndarray:
+    """Klasifikasi nama client ke kunci operator; satu np.select, bukan if/elif per baris.
+
+    Urutan kondisi penting: telkomsel harus dicek sebelum telkom.
+    """
+    cl = client_names.fillna("").astype(str).str.lower()
+    conds = [
+        cl.str.contains("telkomsel", regex=False),
+        cl.str.contains("telkom", regex=False),
+        cl.str.contains("ioh|indosat|ooredoo|hutchison"),
+        cl.str.contains("xl|smart|axis"),
+    ]
+    return np.select(conds, ["telkomsel", "telkom", "ioh", "xlsmart"], default="telkom")
+
+
+# Di atas ambang ini folium (satu elemen DOM per garis link) mulai berat di
+# browser; pydeck menggambar batch lewat WebGL sehingga tetap responsif.
+MAX_FOLIUM_LINKS = 1500
+
+
+
+@st.cache_resource(
+    ttl=600,
+    max_entries=8,
+    show_spinner=False,
+    hash_funcs={pd.DataFrame: _df_cache_key},
+)
+def build_folium_map(links_paths, sites_points, center_lat, center_lon, line_weight):
+    """Bangun objek peta folium lengkap (tiles, marker, garis link, legend).
+
+    Di-cache dengan st.cache_resource supaya rerun yang tidak mengubah data
+    atau pengaturan sidebar tidak perlu membangun ulang seluruh peta.
+    """
     import folium
-    from streamlit_folium import st_folium
 
-    # Base map without default tiles; we'll add multiple layers with proper attributions
+    # Base map without default tiles; we'll add multiple layers with proper attributions.
+    # Tetap pakai renderer SVG: efek hover garis mengandalkan aturan CSS
+    # :hover pada node SVG, dan cabang folium sudah dibatasi MAX_FOLIUM_LINKS
+    # sehingga jumlah node tidak pernah besar (di atas itu pydeck yang jalan)
     m = folium.Map(location=[center_lat, center_lon], zoom_start=10, tiles=None, control_scale=True)
 
     providers = [
@@ -1108,321 +1360,271 @@ if use_folium:
 
     # Plugins for a more polished UX
     try:
-        from folium.plugins import MarkerCluster, MiniMap, Fullscreen, MousePosition, MeasureControl, BeautifyIcon, AntPath
-        MarkerCluster(name='Sites').add_to(m)
-        mc = None
-        # find last added MarkerCluster (simplify):
-        for ch in list(m._children.values()):
-            if hasattr(ch, 'layer_name') and ch.layer_name == 'Sites':
-                mc = ch
+        from folium.plugins import FastMarkerCluster, MiniMap, Fullscreen, MousePosition, MeasureControl, BeautifyIcon, AntPath
         MiniMap(toggle_display=True).add_to(m)
         Fullscreen().add_to(m)
         MousePosition(position='bottomright', prefix='Koordinat:', separator=' | ', num_digits=6).add_to(m)
         MeasureControl(position='topleft', primary_length_unit='meters', secondary_length_unit='kilometers').add_to(m)
     except Exception:
-        mc = None
+        FastMarkerCluster = None
         BeautifyIcon = None
         AntPath = None
 
-    # Buat FeatureGroup untuk setiap operator (untuk toggle di LayerControl)
-    # Hanya 4 operator: Telkomsel, Telkom, IOH, dan XLSmart
-    operator_groups = {
-        'telkomsel': folium.FeatureGroup(name='🔴 Telkomsel', show=True),
-        'telkom': folium.FeatureGroup(name='🔵 Telkom', show=True),
-        'ioh': folium.FeatureGroup(name='🟡 IOH', show=True),
-        'xlsmart': folium.FeatureGroup(name='🟣 XLSmart', show=True),
+    # FeatureGroup per operator (untuk toggle di LayerControl) dibuat lazy:
+    # hanya operator yang benar-benar punya link yang masuk payload awal
+    # dan daftar LayerControl. Hanya 4 operator: Telkomsel, Telkom, IOH, XLSmart
+    operator_group_names = {
+        'telkomsel': '🔴 Telkomsel',
+        'telkom': '🔵 Telkom',
+        'ioh': '🟡 IOH',
+        'xlsmart': '🟣 XLSmart',
     }
-    
-    # Tambahkan semua group ke peta
-    for group in operator_groups.values():
-        group.add_to(m)
-
-    # Sites as styled markers with Tower Icons (clustered if available)
-    for _, row in sites_points.iterrows():
-        lat_v = float(row["lat"])
-        lon_v = float(row["lon"])
-        tooltip = f"📡 {row['name']} ({row['id']})"
-        popup = folium.Popup(
-            f"<div style='text-align:center;'><span style='font-size:24px;'>📡</span></div>"
-            f"<b>{row['name']}</b><br>ID: {row['id']}<br>Lat: {lat_v:.6f}<br>Lon: {lon_v:.6f}",
-            max_width=260,
-        )
-        # Custom tower icon using DivIcon
-        tower_icon = folium.DivIcon(
-            html="""
-            <div style="
-                font-size: 24px;
-                text-shadow: 2px 2px 4px rgba(0,0,0,0.5), -1px -1px 2px rgba(255,255,255,0.8);
-                filter: drop-shadow(0 2px 4px rgba(0,0,0,0.3));
-            ">📡</div>
-            """,
-            icon_size=(30, 30),
-            icon_anchor=(15, 15),
-        )
-        marker = folium.Marker(location=[lat_v, lon_v], tooltip=tooltip, icon=tower_icon)
-        marker.add_child(popup)
-        (mc or m).add_child(marker)
+    operator_groups = {}
+
+    # Sites as styled markers with Tower Icons (clustered if available).
+    # FastMarkerCluster mengirim array lat/lon mentah dan membiarkan Leaflet
+    # membuat marker di sisi browser — tanpa satu objek folium.Marker per site.
+    if FastMarkerCluster is not None:
+        sites_data = sites_points[["lat", "lon", "name", "id"]].to_numpy().tolist()
+        marker_callback = """
+        function (row) {
+            var icon = L.divIcon({
+                html: '<div style="font-size: 24px; text-shadow: 2px 2px 4px rgba(0,0,0,0.5), -1px -1px 2px rgba(255,255,255,0.8); filter: drop-shadow(0 2px 4px rgba(0,0,0,0.3));">\\ud83d\\udce1</div>',
+                iconSize: [30, 30],
+                iconAnchor: [15, 15],
+                className: ''
+            });
+            var marker = L.marker(new L.LatLng(row[0], row[1]), {icon: icon});
+            marker.bindTooltip('\\ud83d\\udce1 ' + row[2] + ' (' + row[3] + ')');
+            marker.bindPopup(
+                '<div style="text-align:center;"><span style="font-size:24px;">\\ud83d\\udce1</span></div>' +
+                '<b>' + row[2] + '</b><br>ID: ' + row[3] +
+                '<br>Lat: ' + Number(row[0]).toFixed(6) +
+                '<br>Lon: ' + Number(row[1]).toFixed(6),
+                {maxWidth: 260}
+            );
+            return marker;
+        };
+        """
+        FastMarkerCluster(data=sites_data, callback=marker_callback, name='Sites').add_to(m)
+    else:
+        # Fallback tanpa plugin: marker folium biasa langsung ke peta
+        for _, row in sites_points.iterrows():
+            lat_v = float(row["lat"])
+            lon_v = float(row["lon"])
+            tooltip = f"📡 {row['name']} ({row['id']})"
+            popup = folium.Popup(
+                f"<div style='text-align:center;'><span style='font-size:24px;'>📡</span></div>"
+                f"<b>{row['name']}</b><br>ID: {row['id']}<br>Lat: {lat_v:.6f}<br>Lon: {lon_v:.6f}",
+                max_width=260,
+            )
+            # Custom tower icon using DivIcon
+            tower_icon = folium.DivIcon(
+                html="""
+                <div style="
+                    font-size: 24px;
+                    text-shadow: 2px 2px 4px rgba(0,0,0,0.5), -1px -1px 2px rgba(255,255,255,0.8);
+                    filter: drop-shadow(0 2px 4px rgba(0,0,0,0.3));
+                ">📡</div>
+                """,
+                icon_size=(30, 30),
+                icon_anchor=(15, 15),
+            )
+            marker = folium.Marker(location=[lat_v, lon_v], tooltip=tooltip, icon=tower_icon)
+            marker.add_child(popup)
+            m.add_child(marker)
 
     # Links with animated paths for nicer visuals
-    if not links_df.empty:
+    if not links_paths.empty:
+        # Klasifikasi operator sekali untuk semua baris (np.select),
+        # bukan if/elif + str.lower per baris di dalam loop
+        links_paths = links_paths.assign(op=_operator_keys(links_paths["client_name"]))
+
+        # Materialisasi group hanya untuk operator yang muncul di data
+        for op_key in pd.unique(links_paths["op"]):
+            operator_groups[op_key] = folium.FeatureGroup(name=operator_group_names[op_key], show=True)
+            operator_groups[op_key].add_to(m)
+
+        # Tooltip dan popup dihitung sekali sebagai kolom string (konkatenasi
+        # per kolom), bukan f-string besar per baris di dalam loop
+        _client = links_paths["client_name"].astype("string").fillna("-")
+        _from = links_paths["from_site_name"].astype("string").fillna(links_paths["site_from"].astype("string"))
+        _to = links_paths["to_site_name"].astype("string").fillna(links_paths["site_to"].astype("string"))
+        _appl = links_paths["appl_id"].astype("string").fillna("-")
+        _freq = links_paths["freq"].astype("string").fillna("-")
+        _fpair = links_paths["freq_pair"].astype("string").fillna("-")
+        _bw = links_paths["bandwidth"].astype("string").fillna("-")
+        _model = links_paths["model"].astype("string").fillna("-")
+
+        # Tooltip singkat untuk hover (dengan nama site dan client)
+        links_paths = links_paths.assign(
+            tooltip_html=(
+                "🏢 <b>" + _client + "</b><br>📡 " + _from + " → " + _to
+                + "<br>Freq: " + _freq + "/" + _fpair + " MHz | BW: " + _bw + " kHz"
+            ),
+            # Popup lengkap untuk klik
+            popup_html=(
+                '<div style="font-family: Arial, sans-serif; min-width: 250px;">'
+                '<h4 style="margin: 0 0 8px 0; color: #1a73e8; border-bottom: 2px solid #1a73e8; padding-bottom: 5px;">'
+                "📡 Link Info</h4>"
+                '<div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 8px 12px; border-radius: 6px; margin-bottom: 10px;">'
+                '<div style="font-size: 11px; opacity: 0.9;">🏢 Client</div>'
+                '<div style="font-size: 14px; font-weight: bold;">' + _client + "</div></div>"
+                '<table style="width: 100%; font-size: 12px; border-collapse: collapse;">'
+                '<tr><td style="padding: 4px 0; color: #666;"><b>Application ID:</b></td><td style="padding: 4px 0;">' + _appl + "</td></tr>"
+                '<tr style="background: #f0f7ff;"><td style="padding: 4px 0; color: #666;"><b>📍 From:</b></td><td style="padding: 4px 0;"><b>' + _from + "</b></td></tr>"
+                '<tr style="background: #f0f7ff;"><td style="padding: 4px 0; color: #666;"><b>📍 To:</b></td><td style="padding: 4px 0;"><b>' + _to + "</b></td></tr>"
+                '<tr><td style="padding: 4px 0; color: #666;"><b>Frequency:</b></td><td style="padding: 4px 0;"><b style="color: #ff6d00;">' + _freq + " MHz</b></td></tr>"
+                '<tr><td style="padding: 4px 0; color: #666;"><b>Freq Pair:</b></td><td style="padding: 4px 0;"><b style="color: #ff6d00;">' + _fpair + " MHz</b></td></tr>"
+                '<tr style="background: #f5f5f5;"><td style="padding: 4px 0; color: #666;"><b>Bandwidth:</b></td><td style="padding: 4px 0;"><b style="color: #4caf50;">' + _bw + " kHz</b></td></tr>"
+                '<tr><td style="padding: 4px 0; color: #666;"><b>Model:</b></td><td style="padding: 4px 0;">' + _model + "</td></tr>"
+                "</table></div>"
+            ),
+        )
+
         for _, r in links_paths.iterrows():
             coords = r["path"]
             # Convert all points in path from [lon, lat] to [lat, lon] for Folium
             latlon = [[pt[1], pt[0]] for pt in coords]
-            
-            # Ambil informasi link
-            appl_id = r.get('appl_id', '-')
-            freq = r.get('freq', '-')
-            freq_pair = r.get('freq_pair', '-')
-            bandwidth = r.get('bandwidth', '-')
-            model = r.get('model', '-') or '-'
-            site_from = r.get('from_site_name', r.get('site_from', '-'))
-            site_to = r.get('to_site_name', r.get('site_to', '-'))
-            client_name = r.get('client_name', '-') or '-'
-            
-            # Tooltip singkat untuk hover (dengan nama site dan client)
-            tooltip_text = f"🏢 <b>{client_name}</b><br>📡 {site_from} → {site_to}<br>Freq: {freq}/{freq_pair} MHz | BW: {bandwidth} kHz"
-            
-            # Popup lengkap untuk klik
-            popup_html = f"""
-            <div style="font-family: Arial, sans-serif; min-width: 250px;">
-                <h4 style="margin: 0 0 8px 0; color: #1a73e8; border-bottom: 2px solid #1a73e8; padding-bottom: 5px;">
-                    📡 Link Info
-                </h4>
-                <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 8px 12px; border-radius: 6px; margin-bottom: 10px;">
-                    <div style="font-size: 11px; opacity: 0.9;">🏢 Client</div>
-                    <div style="font-size: 14px; font-weight: bold;">{client_name}</div>
-                </div>
-                <table style="width: 100%; font-size: 12px; border-collapse: collapse;">
-                    <tr><td style="padding: 4px 0; color: #666;"><b>Application ID:</b></td><td style="padding: 4px 0;">{appl_id}</td></tr>
-                    <tr style="background: #f0f7ff;"><td style="padding: 4px 0; color: #666;"><b>📍 From:</b></td><td style="padding: 4px 0;"><b>{site_from}</b></td></tr>
-                    <tr style="background: #f0f7ff;"><td style="padding: 4px 0; color: #666;"><b>📍 To:</b></td><td style="padding: 4px 0;"><b>{site_to}</b></td></tr>
-                    <tr><td style="padding: 4px 0; color: #666;"><b>Frequency:</b></td><td style="padding: 4px 0;"><b style="color: #ff6d00;">{freq} MHz</b></td></tr>
-                    <tr><td style="padding: 4px 0; color: #666;"><b>Freq Pair:</b></td><td style="padding: 4px 0;"><b style="color: #ff6d00;">{freq_pair} MHz</b></td></tr>
-                    <tr style="background: #f5f5f5;"><td style="padding: 4px 0; color: #666;"><b>Bandwidth:</b></td><td style="padding: 4px 0;"><b style="color: #4caf50;">{bandwidth} kHz</b></td></tr>
-                    <tr><td style="padding: 4px 0; color: #666;"><b>Model:</b></td><td style="padding: 4px 0;">{model}</td></tr>
-                </table>
-            </div>
-            """
-            popup = folium.Popup(popup_html, max_width=320)
-            
-            # Buat garis highlight untuk efek hover (muncul saat mouse over)
-            # Garis ini lebih tebal dan berwarna terang sebagai indikator hover
-            highlight_line = folium.PolyLine(
-                locations=latlon,
-                color='white',  # Warna highlight
-                weight=16,  # Lebih tebal dari garis utama
-                opacity=0,  # Mulai transparan
-                className='link-highlight'
-            )
-            highlight_line.add_to(m)
-            
-            # Buat garis "hitbox" transparan yang lebih tebal untuk area klik yang lebih mudah
-            # Ini adalah trik untuk memperluas area interaktif tanpa mengubah tampilan visual
-            hitbox_line = folium.PolyLine(
-                locations=latlon, 
-                color="transparent",  # Tidak terlihat
-                weight=25,  # Sangat tebal untuk area klik yang luas
-                opacity=0,
-            )
-            hitbox_line.add_child(folium.Tooltip(tooltip_text, sticky=True))
-            hitbox_line.add_child(popup)
-            hitbox_line.add_to(m)
-            
-            # Mapping warna berdasarkan brand operator
-            # Warna utama dan warna pulse untuk animasi
-            # Hanya 4 operator: Telkomsel, Telkom, IOH, XLSmart
-            client_colors = {
-                'telkomsel': {'main': '#e4002b', 'pulse': '#ff4d6a', 'hover': '#ff6b7a'},  # Merah Telkomsel
-                'telkom': {'main': '#00529b', 'pulse': '#4d8fcc', 'hover': '#66a3d9'},  # Biru Telkom
-                'ioh': {'main': '#ffc600', 'pulse': '#ffe066', 'hover': '#ffdb4d'},  # Kuning/Emas IOH
-                'xlsmart': {'main': '#8b1a8b', 'pulse': '#c44dc4', 'hover': '#d966d9'},  # Ungu XLSmart
-            }
-            
-            # Cari warna dan target group berdasarkan nama client (case insensitive, partial match)
-            client_lower = str(client_name).lower()
-            
-            # Deteksi operator berdasarkan nama client
-            # Urutan penting: telkomsel harus dicek duluan sebelum telkom
-            if 'telkomsel' in client_lower:
-                target_group_key = 'telkomsel'
-            elif 'telkom' in client_lower:
-                target_group_key = 'telkom'
-            elif 'ioh' in client_lower or 'indosat' in client_lower or 'ooredoo' in client_lower or 'hutchison' in client_lower:
-                target_group_key = 'ioh'
-            elif 'xl' in client_lower or 'smart' in client_lower or 'smartfren' in client_lower or 'axis' in client_lower:
-                target_group_key = 'xlsmart'
-            else:
-                # Default ke telkom untuk operator yang tidak dikenal
-                target_group_key = 'telkom'
-            
+
+            popup = folium.Popup(r["popup_html"], max_width=320)
+
+            # Kunci operator sudah dihitung vektorized di atas loop
+            target_group_key = r['op']
+
             # Ambil warna sesuai group
-            colors = client_colors.get(target_group_key, client_colors['telkom'])
+            colors = OPERATOR_COLORS[target_group_key]
             line_color = colors['main']
             pulse_color = colors['pulse']
             hover_color = colors.get('hover', colors['pulse'])
             
             # Dapatkan target group untuk operator ini
-            target_group = operator_groups.get(target_group_key, operator_groups['telkom'])
+            # Group pasti ada: dibuat dari nilai unik kolom op yang sama
+            target_group = operator_groups[target_group_key]
             
+            # Satu polyline per link: tooltip, popup, dan efek hover (CSS/JS di
+            # bawah) menempel langsung pada garis yang terlihat — tanpa garis
+            # highlight dan hitbox terpisah yang melipatgandakan elemen DOM
             if AntPath is not None:
                 # Garis animasi yang terlihat - dengan warna sesuai client
-                ant_line = AntPath(latlon, color=line_color, weight=line_weight, opacity=0.9, 
-                                   dash_array=[12, 25], delay=800, pulse_color=pulse_color)
-                ant_line.add_to(target_group)  # Tambahkan ke group operator
+                line = AntPath(latlon, color=line_color, weight=line_weight, opacity=0.9,
+                               dash_array=[12, 25], delay=800, pulse_color=pulse_color)
             else:
                 # Garis statis yang terlihat - dengan warna sesuai client
                 line = folium.PolyLine(locations=latlon, color=line_color, weight=line_weight, opacity=0.9)
-                line.add_to(target_group)  # Tambahkan ke group operator
+            line.add_child(folium.Tooltip(r["tooltip_html"], sticky=True))
+            line.add_child(popup)
+            line.add_to(target_group)  # Tambahkan ke group operator
 
-    # Tambahkan CSS dan JavaScript untuk efek hover pada garis link
-    hover_effect_code = """
-    <style>
-        /* Style untuk efek hover pada garis link */
-        .leaflet-interactive:hover {
-            stroke-opacity: 1 !important;
-        }
-        .link-hover-active {
-            stroke: white !important;
-            stroke-width: 14px !important;
-            stroke-opacity: 0.8 !important;
-            filter: drop-shadow(0 0 8px rgba(255,255,255,0.9));
-        }
-    </style>
-    <script>
-    (function() {
-        function setupHoverEffects() {
-            // Dapatkan semua polyline di peta
-            var polylines = document.querySelectorAll('.leaflet-interactive');
-            
-            polylines.forEach(function(polyline) {
-                // Simpan style asli
-                var originalStroke = polyline.getAttribute('stroke');
-                var originalStrokeWidth = polyline.getAttribute('stroke-width');
-                var originalStrokeOpacity = polyline.getAttribute('stroke-opacity');
-                
-                // Event mouseenter - tampilkan efek hover
-                polyline.addEventListener('mouseenter', function(e) {
-                    // Tambahkan efek glow dan bawa ke depan
-                    this.style.filter = 'drop-shadow(0 0 6px rgba(255,255,255,0.9)) drop-shadow(0 0 10px rgba(255,255,255,0.7))';
-                    this.style.strokeWidth = '12px';
-                    this.style.strokeOpacity = '1';
-                    
-                    // Bawa element ke depan (z-index trick for SVG)
-                    this.parentNode.appendChild(this);
-                });
-                
-                // Event mouseleave - kembalikan ke normal
-                polyline.addEventListener('mouseleave', function(e) {
-                    this.style.filter = '';
-                    this.style.strokeWidth = originalStrokeWidth;
-                    this.style.strokeOpacity = originalStrokeOpacity;
-                });
-            });
-        }
-        
-        // Jalankan setelah peta dimuat
-        setTimeout(setupHoverEffects, 1000);
-        setTimeout(setupHoverEffects, 2000);
-        setTimeout(setupHoverEffects, 3000);
-    })();
-    </script>
-    """
-    m.get_root().html.add_child(folium.Element(hover_effect_code))
+    # Overlay statis (CSS hover + legend) dari konstanta level modul
+    m.get_root().html.add_child(folium.Element(_HOVER_EFFECT_HTML))
 
-    # Tambahkan legend di dalam peta
-    filter_legend_html = """
-    <style>
-        #operator-legend {
-            position: fixed;
-            bottom: 50px;
-            left: 10px;
-            z-index: 9999;
-            background: white;
-            padding: 12px 16px;
-            border-radius: 10px;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.2);
-            font-family: Arial, sans-serif;
-            font-size: 12px;
-            max-width: 200px;
-        }
-    </style>
-    
-    <!-- Legend di bawah -->
-    <div id="operator-legend">
-        <div style="font-weight: bold; margin-bottom: 10px; font-size: 13px; color: #333; border-bottom: 2px solid #1a73e8; padding-bottom: 6px;">
-            📡 Legend Operator
-        </div>
-        <div style="display: flex; align-items: center; margin-bottom: 6px;">
-            <div style="width: 30px; height: 6px; background: #e4002b; border-radius: 3px; margin-right: 10px;"></div>
-            <span style="color: #333;">🔴 Telkomsel</span>
-        </div>
-        <div style="display: flex; align-items: center; margin-bottom: 6px;">
-            <div style="width: 30px; height: 6px; background: #00529b; border-radius: 3px; margin-right: 10px;"></div>
-            <span style="color: #333;">🔵 Telkom</span>
-        </div>
-        <div style="display: flex; align-items: center; margin-bottom: 6px;">
-            <div style="width: 30px; height: 6px; background: #ffc600; border-radius: 3px; margin-right: 10px;"></div>
-            <span style="color: #333;">🟡 IOH</span>
-        </div>
-        <div style="display: flex; align-items: center;">
-            <div style="width: 30px; height: 6px; background: #8b1a8b; border-radius: 3px; margin-right: 10px;"></div>
-            <span style="color: #333;">🟣 XLSmart</span>
-        </div>
-    </div>
-    """
-    m.get_root().html.add_child(folium.Element(filter_legend_html))
+    m.get_root().html.add_child(folium.Element(_LEGEND_HTML))
 
     folium.LayerControl(position='topright', collapsed=False).add_to(m)
-    st_folium(m, use_container_width=True, returned_objects=[])
+    return m
+
+
+@st.cache_data(
+    ttl=600,
+    max_entries=8,
+    show_spinner=False,
+    hash_funcs={pd.DataFrame: _df_cache_key},
+)
+def render_map_html(links_paths, sites_points, center_lat, center_lon, line_weight) -> str:
+    """Render peta folium ke string HTML (di-cache dengan kunci yang sama
+    dengan build_folium_map)."""
+    return build_folium_map(links_paths, sites_points, center_lat, center_lon, line_weight).get_root().render()
+
+
+if use_folium and len(links_paths) <= MAX_FOLIUM_LINKS:
+    import streamlit.components.v1 as components
+
+    # Embed statis: aplikasi tidak membaca klik/bounds dari peta, jadi jembatan
+    # postMessage st_folium hanya overhead — pan/zoom ditangani murni di browser
+    # tanpa memicu rerun Streamlit
+    components.html(
+        render_map_html(links_paths, sites_points, center_lat, center_lon, line_weight),
+        height=700,
+        scrolling=False,
+    )
 
 else:
     import pydeck as pdk
 
-    scatter_layer = pdk.Layer(
-        "ScatterplotLayer",
-        data=sites_vis,
-        get_position="[lon, lat]",
-        get_fill_color=[0, 122, 255, 180],
-        get_radius=150,
-        pickable=True,
+    # Jangan bangun ulang Deck kalau input tidak berubah — pan/zoom peta
+    # memicu rerun Streamlit penuh, jadi Deck terakhir disimpan di
+    # session_state dengan kunci kombinasi filter/slider plus fingerprint
+    # isi data (edit yang tidak mengubah jumlah baris tetap terdeteksi)
+    deck_key = (
+        None if selected_client is None else int(selected_client),
+        int(line_weight),
+        float(sep_dist_m) if sep_dup else 0.0,
+        float(link_offset_m),
+        _df_cache_key(sites_vis),
+        _df_cache_key(links_paths),
+        round(center_lat, 6),
+        round(center_lon, 6),
     )
+    if st.session_state.get("deck_key") == deck_key and "deck_obj" in st.session_state:
+        r = st.session_state["deck_obj"]
+    else:
+        # pydeck menserialisasi data layer ke JSON; kirim hanya kolom yang
+        # benar-benar dibaca layer/tooltip supaya payload ke browser tetap kecil
+        scatter_layer = pdk.Layer(
+            "ScatterplotLayer",
+            id="sites",
+            data=sites_vis[["lon", "lat", "name", "id", "group_size"]],
+            get_position="[lon, lat]",
+            get_fill_color=[0, 122, 255, 180],
+            get_radius=150,
+            pickable=True,
+        )
 
-    path_layer = pdk.Layer(
-        "PathLayer",
-        data=links_paths,
-        get_path="path",
-        get_color=[255, 99, 71, 200],
-        width_scale=1,
-        width_min_pixels=2,
-        get_width=3,
-        pickable=True,
-    )
+        # Warna garis per operator (RGBA) dari palet bersama, dihitung sekali
+        operator_rgba = {k: _hex_to_rgba(v["main"]) for k, v in OPERATOR_COLORS.items()}
+
+        # Satu ArcLayer menggantikan PathLayer + layer panah: arah link
+        # dikodekan lewat gradasi warna source (warna operator) -> target
+        # (oranye panah lama); link yang tumpang tindih dipisah lewat tilt
+        # dari curve_offset, jadi kolom path/kurva tidak perlu dikirim
+        links_payload = links_paths[
+            ["offset_from_lon", "offset_from_lat", "offset_to_lon", "offset_to_lat"]
+        ].assign(
+            color_rgba=[operator_rgba[k] for k in _operator_keys(links_paths["client_name"])],
+            tilt=np.clip(links_paths["curve_offset"].to_numpy(np.float64), -60.0, 60.0)
+            if not links_paths.empty else 0.0,
+        )
 
-    # Panah arah menggunakan TextLayer (unicode arrow) diputar sesuai bearing
-    arrow_layer = pdk.Layer(
-        "TextLayer",
-        data=arrows_df,
-        get_position="[lon, lat]",
-        get_text="label",
-        get_color=[255, 80, 0, 230],
-        get_size=18,
-        get_angle="angle",
-        get_alignment_baseline="center",
-        billboard=True,
-        pickable=True,
-    )
+        arc_layer = pdk.Layer(
+            "ArcLayer",
+            id="links",
+            data=links_payload,
+            get_source_position="[offset_from_lon, offset_from_lat]",
+            get_target_position="[offset_to_lon, offset_to_lat]",
+            get_source_color="color_rgba",
+            get_target_color=[255, 80, 0, 230],
+            get_width=line_weight,
+            get_tilt="tilt",
+            pickable=True,
+            # Matikan depth test supaya arc yang bertumpuk tidak saling
+            # memotong secara aneh di sudut kamera miring
+            parameters={"depthTest": False},
+        )
 
-    tooltip = {
-        "html": "<b>{name}</b><br/>ID: {id}<br/>Lat: {lat}<br/>Lon: {lon}<br/>Group: {group_size}",
-        "style": {"backgroundColor": "#fff", "color": "#111"},
-    }
+        tooltip = {
+            "html": "<b>{name}</b><br/>ID: {id}<br/>Lat: {lat}<br/>Lon: {lon}<br/>Group: {group_size}",
+            "style": {"backgroundColor": "#fff", "color": "#111"},
+        }
 
-    r = pdk.Deck(
-        layers=[path_layer, arrow_layer, scatter_layer],
-        initial_view_state=pdk.ViewState(latitude=center_lat, longitude=center_lon, zoom=10, pitch=0),
-        map_style="mapbox://styles/mapbox/light-v10",
-        tooltip=tooltip,
-    )
+        r = pdk.Deck(
+            layers=[arc_layer, scatter_layer],
+            initial_view_state=pdk.ViewState(latitude=center_lat, longitude=center_lon, zoom=10, pitch=0),
+            map_style="mapbox://styles/mapbox/light-v10",
+            tooltip=tooltip,
+        )
+
+        st.session_state["deck_key"] = deck_key
+        st.session_state["deck_obj"] = r
 
     st.pydeck_chart(r, use_container_width=True)